@@ -14,7 +14,16 @@ from pydantic import BaseModel
 import google.generativeai as genai
 from PIL import Image
 import logging
+import hashlib
 from urllib.parse import urlparse
+from core_api.prompts import (
+    TECHNOLOGIST_INSTRUCTIONS, RECIPE_CALCULATOR_INSTRUCTIONS,
+    build_technologist_prompt, build_recipe_calculator_prompt,
+)
+from core_api.prompt_cache import PromptCache, FakeGenerativeModel
+from core_api.query_routing import (
+    GENERAL_BRAND, GENERAL_CATEGORY, classify_catalog, analyze_query, count_routed_hits,
+)
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -33,18 +42,25 @@ if os.getenv("DEVELOPMENT_MODE") == "true":
 CHROMA_URL = os.getenv("CHROMA_DB_URL", "http://vectordb:8000")
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 CURRENT_MODEL_NAME = 'gemini-2.5-flash'  
+# "fake" — локальная заглушка вместо Gemini (замеры токенов и задержки)
+AI_BACKEND = os.getenv("AI_BACKEND", "gemini")
 
-if not GEMINI_KEY:
+if AI_BACKEND == "fake":
+    logger.warning("⚠️ AI_BACKEND=fake: ответы генерирует локальная заглушка")
+elif not GEMINI_KEY:
     logger.error("❌ ОШИБКА: Нет API ключа Gemini!")
 else:
     genai.configure(api_key=GEMINI_KEY)
 
 try:
-    ai_model = genai.GenerativeModel(CURRENT_MODEL_NAME)
+    ai_model = FakeGenerativeModel(CURRENT_MODEL_NAME) if AI_BACKEND == "fake" else genai.GenerativeModel(CURRENT_MODEL_NAME)
 except Exception as e:
     logger.error(f"❌ Ошибка инициализации модели: {e}")
     ai_model = None
 
+# Статические инструкции технолога/калькулятора кэшируются на модель + версию базы знаний
+prompt_cache = PromptCache(CURRENT_MODEL_NAME, backend=AI_BACKEND)
+
 # Настройка ChromaDB с fallback
 try:
     parsed_url = urlparse(CHROMA_URL)
@@ -111,7 +127,37 @@ class RecipeRequest(BaseModel):
     production_type: Optional[str] = "промислове"
 
 # --- 4. ФУНКЦИИ И ГЕНЕРАТОРЫ ПРОМПТОВ ---
+# Если из запрошенных разделов (без общих чанков) найдено меньше — маршрутизация, скорее всего, ошиблась
+MIN_ROUTED_RESULTS = 3
+
+def search_knowledge_base(query: str, n_results: int = 50, filtered_n_results: int = 20,
+                          routing_text: Optional[str] = None, include_mixes: bool = False) -> dict:
+    where = analyze_query(routing_text or query, include_mixes=include_mixes)
+    if where:
+        try:
+            results = collection.query(query_texts=[query], n_results=filtered_n_results, where=where)
+            hits = count_routed_hits(results, where)
+            if hits >= MIN_ROUTED_RESULTS:
+                logger.info(f"🔎 Поиск по разделам: {where} ({hits} профильных фрагментов)")
+                return results
+            logger.info(f"🔎 По разделам {where} найдено {hits} профильных фрагментов, ищу по всей базе")
+        except Exception as e:
+            logger.warning(f"⚠️ Фильтрованный поиск не удался, ищу по всей базе: {e}")
+    return collection.query(query_texts=[query], n_results=n_results)
+
+def compute_knowledge_base_version(data_dir: str = "data") -> str:
+    if not os.path.exists(data_dir):
+        return "empty"
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(data_dir)):
+        stat = os.stat(os.path.join(data_dir, filename))
+        digest.update(f"{filename}:{stat.st_size}:{int(stat.st_mtime)}\n".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+knowledge_base_version = compute_knowledge_base_version()
+
 def update_knowledge_base():
+    global knowledge_base_version
     data_dir = "data"
     if not os.path.exists(data_dir):
         return False
@@ -134,7 +180,7 @@ def update_knowledge_base():
                 chunks = [text[i:i+1500] for i in range(0, len(text), 1200)] 
                 for i, chunk in enumerate(chunks):
                     docs.append(chunk)
-                    metadatas.append({"source": "balex_knowledge.txt"})
+                    metadatas.append({"source": "balex_knowledge.txt", "brand": GENERAL_BRAND, "category": GENERAL_CATEGORY})
                     ids.append(f"txt_chunk_{i}")
             logger.info(f"✅ Загружен TXT: {len(chunks)} чанков")
         except Exception as e:
@@ -152,6 +198,7 @@ def update_knowledge_base():
                         text += extracted + "\n"
                 
                 chunk_size, overlap = 1500, 300
+                partition = classify_catalog(filename)
                 chunks = []
                 for i in range(0, len(text), chunk_size - overlap):
                     chunk = text[i:i + chunk_size]
@@ -160,15 +207,16 @@ def update_knowledge_base():
                 
                 for i, chunk in enumerate(chunks):
                     docs.append(chunk)
-                    metadatas.append({"source": filename})
+                    metadatas.append({"source": filename, **partition})
                     ids.append(f"{filename.replace('.pdf', '')}_chunk_{i}")
-                logger.info(f"✅ PDF {filename}: {len(chunks)} чанков")
+                logger.info(f"✅ PDF {filename}: {len(chunks)} чанков ({partition['brand']} / {partition['category']})")
             except Exception as e:
                 logger.error(f"❌ Ошибка PDF {filename}: {e}")
 
     if docs:
         collection.upsert(documents=docs, metadatas=metadatas, ids=ids)
-        logger.info(f"🚀 База обновлена! Загружено {len(docs)} фрагментов")
+        knowledge_base_version = compute_knowledge_base_version(data_dir)
+        logger.info(f"🚀 База обновлена! Загружено {len(docs)} фрагментов (версия {knowledge_base_version})")
         return True
     return False
 
@@ -209,86 +257,12 @@ def clean_json_response(text: str) -> str:
     if text.endswith("```"): text = text[:-3]
     return text.strip()
 
-def build_technologist_prompt(question: str, context_text: str, sources: list = None) -> str:
-    catalog_info = ""
-    if sources:
-        unique_sources = list(set(sources))
-        catalog_info = f"\n📚 **Доступні каталоги:** {', '.join(unique_sources)}\n"
-    
-    return f"""
-**ТИ — ГОЛОВНИЙ ТЕХНОЛОГ КОМПАНІЇ ** з 15+ років досвіду в харчовій промисловості.
-
-** ТВОЯ РОЛЬ:**
-Консультуєш B2B клієнтів з підбору інгредієнтів та розробки рецептур на основі асортименту.
-
-**📦 НАША ПРОДУКЦІЯ:**
-**Бренд "Optima":** Сухі суміші для випічки, Поліпшувачі хліба, Базові наповнювачі, Шоколадна продукція (ChocoCraft).
-**Бренд "Golden Mile":** Фруктові наповнювачі, Молочні начинки, Макові начинки, Кондитерські наповнювачі, Сиропи, Мед штучний.
-
-** ЛОГІКА ТВОЄЇ РОБОТИ (Chain of Thought):**
-1. **Аналізуй запит:** Що шукає клієнт?
-2. **Перевіряй контекст:** Чи є точні назви, дозування?
-3. **Особливості PDF:** Опис та дозування можуть знаходитися ПЕРЕД або ПІСЛЯ назви товару.
-4. **Перевіряй вхідні дані для розрахунків:** Якщо просять розрахунок, але НЕ вказали об'єм → ЗУПИНИСЬ і запитай. Якщо ВКАЗАЛИ → роби розрахунок.
-
-**⚖️ КРИТИЧНІ ПРАВИЛА:**
-** ЗАБОРОНА НА ВИГАДКИ:** Використовуй ВИКЛЮЧНО інформацію з контексту. НЕ вигадуй дозування.
-**🧮 ЗАБОРОНА НА УМОВНІ РОЗРАХУНКИ:** Якщо немає об'єму виробництва (у шт чи кг), ТИ МАЄШ відповісти:
-*"Для точного розрахунку рецептури та собівартості, будь ласка, уточніть планований об'єм виробництва (наприклад: 500 еклерів/день або 50 кг тіста/день). Тоді я зможу підібрати оптимальне рішення!"*
-** МОВНИЙ БАР'ЄР ТА ЧИСТОТА:** - Якщо в каталозі назва або опис вказані англійською (або іншою мовою), ОБОВ'ЯЗКОВО переклади їх на українську.
-- НЕ пиши фрази типу "зі сторінки 10" або "з англійської частини". Видавай лише чисту комерційну пропозицію.
-
-**СТРУКТУРА ВІДПОВІДІ:**
-Для **конкретних товарів**: Назва, Властивості, Дозування, Фасування.
-Для **комплексних рішень** (якщо є об'єм):
-**БАЗОВА СУМІШ (Optima):** [Назва] | Дозування: [г на кг тіста]
-**НАЧИНКА (Golden Mile):** [Назва] | Термостабільність | Дозування: [г на виріб]
-**РОЗРАХУНОК ПОТРЕБИ:** Денна: [X] кг суміші + [Y] кг начинки. Місячна (22 дні): [X*22] кг + [Y*22] кг. Рекомендована фасовка.
-
-** МОВА ТА СТИЛЬ:** Професійний, дружній, мовою запиту клієнта.
-{catalog_info}
-**📄 КОНТЕКСТ З КАТАЛОГІВ:**
-{context_text}
-**❓ ЗАПИТ КЛІЄНТА:**
-{question}
-"""
-
-def build_recipe_calculator_prompt(product: str, volume: int, context: str) -> str:
-    return f"""
-**ТИ — ГОЛОВНИЙ ТЕХНОЛОГ GOLDEN MILE/BALEX.** Розраховуєш рецептуру для B2B клієнта.
-
-**ВИХІДНІ ДАНІ:**
-- Продукт: {product}
-- Об'єм виробництва: {volume} шт/день
-
-**ЗАВДАННЯ:**
-1. Підбери БАЗОВУ СУМІШ Optima (точна назва з каталогу).
-2. Підбери НАЧИНКУ Golden Mile (врахуй термостабільність!).
-3. Розрахуй денну та місячну (22 робочі дні) потребу в кілограмах.
-4. Порекомендуй оптимальну фасовку для закупів дозування з контексту.
-
-**⚖️ ВАЖЛИВО:** 1. Використовуй ТІЛЬКИ дозування з контексту. Якщо немає — пиши "Потрібна додаткова консультація".
-2.  **МОВНИЙ БАР'ЄР:** Якщо в каталозі назва або опис вказані англійською, ОБОВ'ЯЗКОВО переклади їх на українську (наприклад, "Poppy seed filling" -> "Макова начинка"). Уся відповідь має бути українською мовою.
-3.  **ЖОДНОГО МЕТА-ТЕКСТУ:** НЕ пиши номери сторінок (наприклад, "зі сторінки 82") або фрази "з каталогу". Клієнту потрібен готовий бізнес-звіт.
-
-**КОНТЕКСТ З БАЗИ ЗНАНЬ:** {context}
-
-**ФОРМАТ ВІДПОВІДІ:**
-**1. Рекомендовані інгредієнти:**
-- **Суміш (Optima):** [Назва українською] | Дозування: [Х] г на 1 кг
-- **Начинка (Golden Mile):** [Назва українською] | Дозування: [Х] г на 1 шт
-**2. Розрахунок потреби (на {volume} шт/день):**
-- **На день:** [Х] кг суміші, [Y] кг начинки
-- **На місяць (22 дні):** [Х] кг суміші, [Y] кг начинки
-**3. Рекомендація щодо закупівлі:** [Фасовка з каталогу]
-"""
-
 # --- ЭНДПОИНТЫ ---
 @app.post("/agent/technologist/ask", response_model=AIResponse)
 async def ask_technologist(request: QueryRequest):
     if not ai_model: raise HTTPException(status_code=503, detail="AI модель недоступна")
     try:
-        results = collection.query(query_texts=[request.question], n_results=50)
+        results = search_knowledge_base(request.question)
         retrieved_docs = results['documents'][0] if results['documents'] else []
         context_text = "\n\n".join(retrieved_docs)
         
@@ -297,7 +271,8 @@ async def ask_technologist(request: QueryRequest):
             sources_list = [m.get('source', 'Unknown') for m in results['metadatas'][0] if m]
         
         prompt = build_technologist_prompt(request.question, context_text, sources_list)
-        response = ai_model.generate_content(prompt)
+        model = prompt_cache.get_model("technologist", TECHNOLOGIST_INSTRUCTIONS, knowledge_base_version)
+        response = model.generate_content(prompt)
         return AIResponse(answer=response.text, sources=list(set(sources_list)))
     except Exception as e:
         logger.error(f"❌ Ошибка ask_technologist: {e}")
@@ -308,11 +283,12 @@ async def calculate_recipe(request: RecipeRequest):
     if not ai_model: raise HTTPException(status_code=503, detail="AI недоступен")
     try:
         search_query = f"{request.product} начинка суміш дозування рецептура"
-        results = collection.query(query_texts=[search_query], n_results=50)
+        results = search_knowledge_base(search_query, routing_text=request.product, include_mixes=True)
         context = "\n\n".join(results['documents'][0] if results['documents'] else [])
         
         prompt = build_recipe_calculator_prompt(request.product, request.volume, context)
-        response = ai_model.generate_content(prompt)
+        model = prompt_cache.get_model("recipe", RECIPE_CALCULATOR_INSTRUCTIONS, knowledge_base_version)
+        response = model.generate_content(prompt)
         
         sources_list = []
         if results.get('metadatas') and results['metadatas'][0]:
@@ -329,6 +305,9 @@ async def calculate_recipe(request: RecipeRequest):
 @app.post("/agent/doc/digitize", response_model=DigitalForm)
 async def digitize_document(file: UploadFile = File(...)):
     if not ai_model: raise HTTPException(status_code=503, detail="AI недоступна")
+    # Fake-бэкенд не распознаёт изображения: без этой проверки ошибка разбора его текста
+    # ушла бы в except ниже и вернулась как HTTP 200 с is_valid=False, маскируя режим
+    if AI_BACKEND == "fake": raise HTTPException(status_code=503, detail="Оцифровка недоступна в режиме AI_BACKEND=fake")
     try:
         contents = await file.read()
         user_image = Image.open(io.BytesIO(contents))
@@ -362,7 +341,7 @@ async def health_check():
         "status": "healthy", "timestamp": datetime.now().isoformat(),
         "uptime_seconds": (datetime.now() - app.state.start_time).total_seconds(), "services": {}
     }
-    health["services"]["gemini"] = {"status": "operational", "model": CURRENT_MODEL_NAME} if ai_model else {"status": "unavailable"}
+    health["services"]["gemini"] = {"status": "operational", "model": CURRENT_MODEL_NAME, "backend": AI_BACKEND} if ai_model else {"status": "unavailable"}
     try:
         health["services"]["chromadb"] = {"status": "operational", "records": collection.count()}
     except Exception as e:
@@ -376,5 +355,7 @@ async def get_metrics():
         "total_requests": getattr(app.state, "request_count", 0),
         "knowledge_base_size": collection.count(),
         "uptime_seconds": (datetime.now() - app.state.start_time).total_seconds(),
-        "model": CURRENT_MODEL_NAME
+        "model": CURRENT_MODEL_NAME,
+        "knowledge_base_version": knowledge_base_version,
+        "prompt_cache": prompt_cache.info()
     }
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import re
+import time
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# --- НАСТРОЙКИ ---
+PROMPT_CACHE_TTL_MINUTES = int(os.getenv("PROMPT_CACHE_TTL_MINUTES", "60"))
+# Пересоздаём кэш немного заранее (доля от TTL), чтобы запрос не попал на уже истёкший
+PROMPT_CACHE_REFRESH_FRACTION = 0.1
+
+FAKE_AI_BASE_LATENCY_MS = float(os.getenv("FAKE_AI_BASE_LATENCY_MS", "150"))
+FAKE_AI_MS_PER_1K_TOKENS = float(os.getenv("FAKE_AI_MS_PER_1K_TOKENS", "40"))
+# Минимальный размер context cache, как у gemini-2.5-flash. Инструкции короче — только system instruction
+FAKE_AI_MIN_CACHE_TOKENS = int(os.getenv("FAKE_AI_MIN_CACHE_TOKENS", "1024"))
+
+def approx_token_count(text: str) -> int:
+    # Грубая оценка: слова и знаки препинания. Для сравнения "до/после" достаточно.
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def _contents_text(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(c for c in contents if isinstance(c, str))
+    return str(contents)
+
+class FakeGenerativeModel:
+    """Локальная замена genai.GenerativeModel для замеров без обращения к Gemini.
+
+    Считает входные токены (в т.ч. закэшированные) и имитирует задержку,
+    пропорциональную числу НЕ закэшированных токенов.
+    """
+
+    def __init__(self, model_name: str, system_instruction: Optional[str] = None, cached: bool = False):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.cached = cached
+        self._instruction_tokens = approx_token_count(system_instruction) if system_instruction else 0
+
+    def generate_content(self, contents):
+        request_tokens = approx_token_count(_contents_text(contents))
+        cached_tokens = self._instruction_tokens if self.cached else 0
+        prompt_tokens = request_tokens + self._instruction_tokens
+        billed_tokens = prompt_tokens - cached_tokens
+
+        time.sleep((FAKE_AI_BASE_LATENCY_MS + FAKE_AI_MS_PER_1K_TOKENS * billed_tokens / 1000) / 1000)
+
+        text = f"[fake:{self.model_name}] Відповідь на запит ({billed_tokens} вхідних токенів)."
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens,
+            candidates_token_count=approx_token_count(text),
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+class PromptCache:
+    """Модели с предзагруженными статическими инструкциями, по одной на роль.
+
+    Ключ кэша — модель + текст инструкций + версия базы знаний. Если ключ
+    изменился или истёк TTL, модель (и context cache в Gemini) пересоздаётся.
+    Context cache у Gemini имеет минимальный размер: для более коротких инструкций
+    остаётся system instruction, и они тарифицируются как вход в каждом запросе.
+    Фактический режим виден в info() и в /metrics.
+    """
+
+    def __init__(self, model_name: str, backend: str = "gemini", ttl_minutes: int = PROMPT_CACHE_TTL_MINUTES):
+        self.model_name = model_name
+        self.backend = backend
+        if ttl_minutes < 1:
+            raise ValueError(f"PROMPT_CACHE_TTL_MINUTES должен быть не меньше 1, получено {ttl_minutes}")
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.refresh_margin = self.ttl * PROMPT_CACHE_REFRESH_FRACTION
+        self._entries = {}
+
+    @staticmethod
+    def make_key(model_name: str, system_instruction: str, kb_version: str) -> str:
+        raw = f"{model_name}\n{kb_version}\n{system_instruction}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()[:16]
+
+    def get_model(self, role: str, system_instruction: str, kb_version: str):
+        key = self.make_key(self.model_name, system_instruction, kb_version)
+        entry = self._entries.get(role)
+        if entry and entry["key"] == key and datetime.now() < entry["expires_at"] - self.refresh_margin:
+            return entry["model"]
+
+        if entry:
+            self._drop(entry)
+        model, cached_content, mode = self._create(role, key, system_instruction)
+        self._entries[role] = {
+            "key": key, "model": model, "cached_content": cached_content, "mode": mode,
+            "kb_version": kb_version, "created_at": datetime.now(), "expires_at": datetime.now() + self.ttl,
+        }
+        logger.info(f"🧠 Кэш промпта '{role}' создан: {mode}, ключ {key}, база {kb_version}")
+        return model
+
+    def _create(self, role: str, key: str, system_instruction: str):
+        if self.backend == "fake":
+            if approx_token_count(system_instruction) >= FAKE_AI_MIN_CACHE_TOKENS:
+                return FakeGenerativeModel(self.model_name, system_instruction, cached=True), None, "context_cache"
+            return FakeGenerativeModel(self.model_name, system_instruction, cached=False), None, "system_instruction"
+
+        import google.generativeai as genai
+        try:
+            from google.generativeai import caching
+            cached_content = caching.CachedContent.create(
+                model=self.model_name,
+                display_name=f"balex-{role}-{key}",
+                system_instruction=system_instruction,
+                ttl=self.ttl,
+            )
+            return genai.GenerativeModel.from_cached_content(cached_content=cached_content), cached_content, "context_cache"
+        except Exception as e:
+            # Например, инструкции короче минимального размера кэша — остаётся system instruction
+            logger.warning(f"⚠️ Context cache для '{role}' недоступен, использую system instruction: {e}")
+            return genai.GenerativeModel(self.model_name, system_instruction=system_instruction), None, "system_instruction"
+
+    def _drop(self, entry: dict):
+        if entry.get("cached_content") is not None:
+            try:
+                entry["cached_content"].delete()
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось удалить старый кэш промпта: {e}")
+
+    def info(self) -> dict:
+        return {
+            role: {"mode": e["mode"], "key": e["key"], "kb_version": e["kb_version"], "created_at": e["created_at"].isoformat()}
+            for role, e in self._entries.items()
+        }
+
+# --- ЗАМЕР НА ЛОКАЛЬНОМ FAKE-БЭКЕНДЕ ---
+# python -m core_api.prompt_cache --requests 20
+# Колонка "режим" показывает, что реально будет тарифицировать Gemini (FAKE_AI_MIN_CACHE_TOKENS)
+def _benchmark(requests_count: int):
+    from core_api.prompts import (
+        TECHNOLOGIST_INSTRUCTIONS, RECIPE_CALCULATOR_INSTRUCTIONS,
+        build_technologist_prompt, build_recipe_calculator_prompt,
+    )
+
+    model_name = "gemini-2.5-flash"
+    context = "Макова начинка Golden Mile. Термостабільна. Дозування 30-40 г на виріб. Фасування: відро 6 кг.\n" * 20
+    cases = [
+        ("technologist", TECHNOLOGIST_INSTRUCTIONS,
+         lambda i: build_technologist_prompt(f"Яка макова начинка підійде для булочок #{i}?", context, ["Наповнювачі_макові.pdf"])),
+        ("recipe", RECIPE_CALCULATOR_INSTRUCTIONS,
+         lambda i: build_recipe_calculator_prompt("булочки з маком", 100 + i, context)),
+    ]
+
+    inline_model = FakeGenerativeModel(model_name)
+    cache = PromptCache(model_name, backend="fake")
+
+    print(f"{'роль':<14}{'режим':<20}{'вх. токенов':>14}{'из кэша':>10}{'мс/запрос':>12}")
+    for role, instructions, build in cases:
+        for mode in ("inline", "cached"):
+            billed, cached, started = 0, 0, time.perf_counter()
+            for i in range(requests_count):
+                if mode == "inline":
+                    response = inline_model.generate_content(instructions + build(i))
+                else:
+                    response = cache.get_model(role, instructions, "bench").generate_content(build(i))
+                usage = response.usage_metadata
+                billed += usage.prompt_token_count - usage.cached_content_token_count
+                cached += usage.cached_content_token_count
+            elapsed_ms = (time.perf_counter() - started) * 1000 / requests_count
+            if mode != "inline":
+                mode = cache.info()[role]["mode"]
+            print(f"{role:<14}{mode:<20}{billed // requests_count:>14}{cached // requests_count:>10}{elapsed_ms:>12.1f}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Замер входных токенов и задержки с кэшем промптов и без (fake-бэкенд)")
+    parser.add_argument("--requests", type=int, default=20)
+    _benchmark(parser.parse_args().requests)
@@ -0,0 +1,88 @@
+import re
+from typing import Optional
+
+# Чанки без категории (общий TXT, сводные каталоги) участвуют в любом поиске по категориям
+GENERAL_BRAND = "all"
+GENERAL_CATEGORY = "general"
+MIXES_CATEGORY = "mixes"
+
+# Разметка базы знаний: бренд и категория определяются по имени файла.
+# Порядок важен — первое совпадение побеждает.
+CATALOG_PARTITIONS = [
+    ("chococraft", "Optima", "chocolate"),
+    ("суміш", "Optima", "mixes"),
+    ("поліпшувач", "Optima", "improvers"),
+    ("мак", "Golden Mile", "poppy"),
+    ("молоч", "Golden Mile", "dairy"),
+    ("сироп", "Golden Mile", "syrup"),
+    ("фрукт", "Golden Mile", "fruit"),
+    ("кондитер", "Golden Mile", "confectionery"),
+    ("мед", "Golden Mile", "honey"),
+    # Сводные каталоги наповнювачів (гетерогенні, гомогенні, загальний) — Golden Mile без категории
+    ("наповнювач", "Golden Mile", GENERAL_CATEGORY),
+]
+
+# Ключевые слова запроса -> категория (regex по началу слова, без учёта регистра)
+QUERY_CATEGORY_KEYWORDS = {
+    "chocolate": ["шокол", "chococraft", "какао", "глазур"],
+    "mixes": ["суміш", "сумiш", "смес"],
+    "improvers": ["поліпшувач", "улучшител"],
+    "poppy": [r"мак(?:ов\w*|у|ом|а)?\b", "poppy"],
+    "dairy": ["молоч", "карамел", "згущ", "сгущ", "вершк", "сливоч", "dairy"],
+    "syrup": ["сироп", "syrup", "просоч"],
+    "fruit": ["фрукт", "ягід", "ягод", "вишн", "яблу", "яблок", "полуниц", "клубник", "абрикос", "малин", "fruit"],
+    "confectionery": ["кондитер"],
+    "honey": [r"мед(?:ов\w*|у|ом)?\b", "honey"],
+}
+
+QUERY_BRAND_KEYWORDS = {
+    "Optima": ["optima", "оптима"],
+    "Golden Mile": ["golden mile", "голден"],
+}
+
+# Вопросы про дозування/розрахунок требуют комплексного решения: начинка + базовая смесь
+QUERY_SOLUTION_KEYWORDS = ["дозуван", "дозиров", "розрах", "расч", "рецептур", "потреб", "скільки", "сколько", "об'єм", "объем"]
+
+def classify_catalog(filename: str) -> dict:
+    name = filename.lower()
+    for keyword, brand, category in CATALOG_PARTITIONS:
+        if keyword in name:
+            return {"brand": brand, "category": category}
+    return {"brand": GENERAL_BRAND, "category": GENERAL_CATEGORY}
+
+def _match_keywords(text: str, keywords_map: dict) -> list:
+    found = []
+    for key, keywords in keywords_map.items():
+        if any(re.search(r"\b" + kw, text) for kw in keywords):
+            found.append(key)
+    return found
+
+def analyze_query(question: str, include_mixes: bool = False) -> Optional[dict]:
+    """Строит фильтр ChromaDB по категориям (или бренду), упомянутым в вопросе.
+
+    include_mixes=True (калькулятор рецептури) или вопрос про дозування/розрахунок
+    всегда добавляет раздел базовых сумішей, чтобы модели было из чего подобрать суміш.
+    """
+    # Украинский апостроф приходит как ’ или ʼ — приводим к ASCII для ключевых слов вроде "об'єм"
+    text = question.lower().replace("’", "'").replace("ʼ", "'")
+
+    categories = _match_keywords(text, QUERY_CATEGORY_KEYWORDS)
+    if categories:
+        if include_mixes or any(re.search(r"\b" + kw, text) for kw in QUERY_SOLUTION_KEYWORDS):
+            if MIXES_CATEGORY not in categories:
+                categories.append(MIXES_CATEGORY)
+        # Категория уже однозначно задаёт бренд, поэтому бренд здесь не сужаем:
+        # "вишнева начинка + суміш Optima" должна найти оба бренда
+        return {"category": {"$in": categories + [GENERAL_CATEGORY]}}
+
+    brands = _match_keywords(text, QUERY_BRAND_KEYWORDS)
+    if brands:
+        return {"brand": {"$in": brands + [GENERAL_BRAND]}}
+    return None
+
+def count_routed_hits(results: dict, where: dict) -> int:
+    """Сколько найденных чанков пришло из запрошенных разделов, не считая общих."""
+    field, condition = next(iter(where.items()))
+    wanted = set(condition["$in"]) - {GENERAL_CATEGORY, GENERAL_BRAND}
+    metadatas = results.get('metadatas') or [[]]
+    return sum(1 for m in (metadatas[0] or []) if m and m.get(field) in wanted)
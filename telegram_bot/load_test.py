@@ -0,0 +1,271 @@
+# Нагрузочный прогон хендлеров бота без Telegram и без core_api.
+#
+# Синтетические апдейты (текстовые вопросы, калькулятор, фото, голосовые) подаются
+# напрямую в Dispatcher из bot.py. Bot API подменяется фейковой сессией, core_api —
+# локальным aiohttp-сервером, Gemini для голосовых — заглушкой. Задержки настраиваются.
+#
+#   python telegram_bot/load_test.py --chats 50 --scenarios 5 --api-latency 3 --voice-latency 1.5
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from datetime import datetime
+from collections import defaultdict
+
+# bot.py создаёт Bot() при импорте и валидирует токен
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:LOAD-TEST-FAKE-TOKEN")
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, EditMessageText, DeleteMessage, GetFile
+from aiogram.types import Update, Message, File
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bot as bot_module
+
+TEXT_QUESTIONS = [
+    "Яка макова начинка термостабільна?",
+    "Порадьте фруктовий наповнювач для круасанів",
+    "Який сироп підійде для просочення бісквіта?",
+    "Що є з сухих сумішей Optima для здобної випічки?",
+    "Карамельна начинка для еклерів — яке дозування?",
+]
+CALC_PRODUCTS = ["еклери", "круасани", "булочки з маком", "тістечка"]
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def jittered(latency: float, jitter: float) -> float:
+    return max(0.0, latency * random.uniform(1 - jitter, 1 + jitter))
+
+class LoadStats:
+    def __init__(self):
+        self.handler_latencies = defaultdict(list)
+        self.error_replies = defaultdict(int)
+        self.loop_lags = []
+        self.bot_api_calls = defaultdict(int)
+        self.updates = 0
+
+# --- ФЕЙКОВЫЙ BOT API ---
+class FakeTelegramSession(BaseSession):
+    """Отвечает на методы Bot API локально, с задержкой сети."""
+
+    def __init__(self, stats: LoadStats, latency: float, jitter: float):
+        super().__init__()
+        self.stats = stats
+        self.latency = latency
+        self.jitter = jitter
+        self._message_ids = itertools.count(1_000_000)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.stats.bot_api_calls[type(method).__name__] += 1
+        await asyncio.sleep(jittered(self.latency, self.jitter))
+
+        if isinstance(method, (SendMessage, EditMessageText)):
+            text = method.text or ""
+            if text.startswith(("❌", "⚠️")):
+                self.stats.error_replies[text.split("\n")[0][:60]] += 1
+            chat_id = method.chat_id if method.chat_id is not None else 0
+            return Message.model_validate({
+                "message_id": method.message_id if isinstance(method, EditMessageText) and method.message_id else next(self._message_ids),
+                "date": datetime.now(),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": text,
+            }, context={"bot": bot})
+        if isinstance(method, DeleteMessage):
+            return True
+        if isinstance(method, GetFile):
+            return File(file_id=method.file_id, file_unique_id=method.file_id, file_size=32_000, file_path=f"files/{method.file_id}")
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        self.stats.bot_api_calls["download_file"] += 1
+        await asyncio.sleep(jittered(self.latency, self.jitter))
+        yield b"\xff\xd8" + os.urandom(32_000)
+
+    async def close(self):
+        pass
+
+# --- ЗАГЛУШКА CORE_API ---
+def build_core_api_stub(args) -> web.Application:
+    async def ask(request):
+        await request.json()
+        await asyncio.sleep(jittered(args.api_latency, args.jitter))
+        return web.json_response({"answer": "Синтетична відповідь технолога.", "sources": ["Наповнювачі_макові.pdf"]})
+
+    async def calculate(request):
+        body = await request.json()
+        await asyncio.sleep(jittered(args.api_latency, args.jitter))
+        return web.json_response({
+            "success": True, "product": body["product"], "volume": body["volume"],
+            "recommendation": "Синтетичний розрахунок.", "sources": ["Каталог суміші.pdf"],
+        })
+
+    async def digitize(request):
+        await request.post()
+        await asyncio.sleep(jittered(args.digitize_latency, args.jitter))
+        return web.json_response({
+            "is_valid": True, "rejection_reason": None, "doc_type": "Журнал температур",
+            "date": "2024-05-20", "inspector_name": "Петров А.В.", "fields": {}, "odoo_id": 1,
+        })
+
+    app = web.Application()
+    app.router.add_post("/agent/technologist/ask", ask)
+    app.router.add_post("/agent/recipe/calculate", calculate)
+    app.router.add_post("/agent/doc/digitize", digitize)
+    return app
+
+class FakeVoiceModel:
+    # Синхронный вызов, как у google.generativeai: блокирует event loop на время "распознавания"
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+
+    def generate_content(self, contents):
+        time.sleep(jittered(self.latency, self.jitter))
+        return type("FakeResponse", (), {"text": random.choice(TEXT_QUESTIONS)})()
+
+# --- ЗАМЕРЫ ---
+class HandlerTimingMiddleware(BaseMiddleware):
+    def __init__(self, stats: LoadStats):
+        self.stats = stats
+
+    async def __call__(self, handler, event, data):
+        name = data["handler"].callback.__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.stats.handler_latencies[name].append(time.perf_counter() - started)
+
+async def monitor_loop_lag(stats: LoadStats, interval: float, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lags.append(max(0.0, time.perf_counter() - started - interval))
+
+# --- СЦЕНАРИИ ---
+class VirtualChat:
+    def __init__(self, chat_id: int, stats: LoadStats, update_ids):
+        self.chat_id = chat_id
+        self.stats = stats
+        self.update_ids = update_ids
+
+    async def send(self, **content):
+        payload = {
+            "message_id": next(self.update_ids),
+            "date": datetime.now(),
+            "chat": {"id": self.chat_id, "type": "private"},
+            "from": {"id": self.chat_id, "is_bot": False, "first_name": f"Load{self.chat_id}"},
+            **content,
+        }
+        update = Update.model_validate({"update_id": next(self.update_ids), "message": payload}, context={"bot": bot_module.bot})
+        self.stats.updates += 1
+        await bot_module.dp.feed_update(bot_module.bot, update)
+
+    async def text_question(self):
+        await self.send(text=random.choice(TEXT_QUESTIONS))
+
+    async def calculator(self):
+        await self.send(text="🧮 Калькулятор рецептури")
+        await self.send(text=random.choice(CALC_PRODUCTS))
+        await self.send(text=str(random.choice([100, 250, 500, 1000])))
+
+    async def photo(self):
+        file_id = f"photo_{self.chat_id}_{next(self.update_ids)}"
+        await self.send(photo=[
+            {"file_id": f"{file_id}_s", "file_unique_id": f"{file_id}_s", "width": 90, "height": 120},
+            {"file_id": file_id, "file_unique_id": file_id, "width": 960, "height": 1280},
+        ])
+
+    async def voice(self):
+        file_id = f"voice_{self.chat_id}_{next(self.update_ids)}"
+        await self.send(voice={"file_id": file_id, "file_unique_id": file_id, "duration": 5})
+
+def parse_mix(raw: str) -> dict:
+    mix = {}
+    for part in raw.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+async def run_chat(chat: VirtualChat, scenarios: int, mix: dict, think_time: float):
+    names, weights = list(mix), list(mix.values())
+    for _ in range(scenarios):
+        await getattr(chat, random.choices(names, weights)[0])()
+        if think_time:
+            await asyncio.sleep(random.uniform(0, think_time))
+
+def print_report(stats: LoadStats, elapsed: float, args):
+    print(f"\n=== Load test: {args.chats} чатів × {args.scenarios} сценаріїв ===")
+    print(f"Апдейтів: {stats.updates} за {elapsed:.1f} с → {stats.updates / elapsed:.1f} апд/с")
+
+    print(f"\n{'хендлер':<20}{'к-сть':>8}{'p50, с':>9}{'p95, с':>9}{'p99, с':>9}{'max, с':>9}")
+    for name, values in sorted(stats.handler_latencies.items()):
+        print(f"{name:<20}{len(values):>8}{percentile(values, 50):>9.2f}{percentile(values, 95):>9.2f}"
+              f"{percentile(values, 99):>9.2f}{max(values):>9.2f}")
+
+    lags_ms = [lag * 1000 for lag in stats.loop_lags]
+    print(f"\nEvent loop lag: p50 {percentile(lags_ms, 50):.1f} мс, p99 {percentile(lags_ms, 99):.1f} мс, "
+          f"max {max(lags_ms, default=0):.1f} мс")
+
+    print("\nВиклики Bot API: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.bot_api_calls.items())))
+    if stats.error_replies:
+        print("⚠️ Відповіді з помилкою:")
+        for text, count in stats.error_replies.items():
+            print(f"  {count:>5} × {text}")
+    else:
+        print("✅ Відповідей з помилкою немає")
+
+async def main(args):
+    random.seed(args.seed)
+    stats = LoadStats()
+
+    runner = web.AppRunner(build_core_api_stub(args))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    bot_module.API_URL = f"http://{host}:{port}"
+
+    bot_module.bot.session = FakeTelegramSession(stats, args.telegram_latency, args.jitter)
+    bot_module.voice_model = FakeVoiceModel(args.voice_latency, args.jitter)
+    bot_module.dp.message.middleware(HandlerTimingMiddleware(stats))
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(stats, args.lag_interval, stop))
+
+    update_ids = itertools.count(1)
+    mix = parse_mix(args.mix)
+    chats = [VirtualChat(100_000 + i, stats, update_ids) for i in range(args.chats)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_chat(chat, args.scenarios, mix, args.think_time) for chat in chats))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await lag_task
+    await runner.cleanup()
+    print_report(stats, elapsed, args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон хендлеров Telegram-бота")
+    parser.add_argument("--chats", type=int, default=20, help="одновременных чатов")
+    parser.add_argument("--scenarios", type=int, default=5, help="сценариев на чат")
+    parser.add_argument("--mix", default="text_question=5,calculator=2,photo=1,voice=1", help="веса сценариев")
+    parser.add_argument("--api-latency", type=float, default=2.0, help="задержка core_api (ask/calculate), с")
+    parser.add_argument("--digitize-latency", type=float, default=4.0, help="задержка оцифровки фото, с")
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="задержка Bot API, с")
+    parser.add_argument("--voice-latency", type=float, default=1.0, help="распознавание голоса (блокирующее), с")
+    parser.add_argument("--jitter", type=float, default=0.3, help="разброс задержек, доля")
+    parser.add_argument("--think-time", type=float, default=0.5, help="пауза пользователя между сценариями, с")
+    parser.add_argument("--lag-interval", type=float, default=0.05, help="шаг замера event loop lag, с")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
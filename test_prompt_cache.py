@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core_api import prompt_cache
+from core_api.prompt_cache import PromptCache
+
+# Кэш инструкций должен переиспользоваться и пересоздаваться только при смене ключа или TTL.
+#   python -m pytest test_prompt_cache.py
+
+def make_cache(**kwargs) -> PromptCache:
+    return PromptCache("gemini-2.5-flash", backend="fake", **kwargs)
+
+def test_same_key_reuses_model():
+    cache = make_cache()
+    assert cache.get_model("recipe", "інструкції", "kb1") is cache.get_model("recipe", "інструкції", "kb1")
+
+def test_changed_instructions_rebuild_model():
+    cache = make_cache()
+    model = cache.get_model("recipe", "інструкції", "kb1")
+    assert cache.get_model("recipe", "нові інструкції", "kb1") is not model
+
+def test_changed_kb_version_rebuilds_model():
+    cache = make_cache()
+    model = cache.get_model("recipe", "інструкції", "kb1")
+    assert cache.get_model("recipe", "інструкції", "kb2") is not model
+    assert cache.info()["recipe"]["kb_version"] == "kb2"
+
+def test_roles_are_cached_separately():
+    cache = make_cache()
+    assert cache.get_model("recipe", "інструкції", "kb1") is not cache.get_model("technologist", "інструкції", "kb1")
+
+def test_expired_entry_rebuilds_model():
+    cache = make_cache(ttl_minutes=10)
+    model = cache.get_model("recipe", "інструкції", "kb1")
+    # Внутри запаса до истечения TTL — уже пересоздаём
+    cache._entries["recipe"]["expires_at"] = datetime.now() + cache.refresh_margin / 2
+    assert cache.get_model("recipe", "інструкції", "kb1") is not model
+
+    model = cache.get_model("recipe", "інструкції", "kb1")
+    cache._entries["recipe"]["expires_at"] = datetime.now() - timedelta(seconds=1)
+    assert cache.get_model("recipe", "інструкції", "kb1") is not model
+
+def test_short_ttl_rejected():
+    with pytest.raises(ValueError):
+        make_cache(ttl_minutes=0)
+
+def test_fake_backend_respects_min_cache_size(monkeypatch):
+    monkeypatch.setattr(prompt_cache, "FAKE_AI_MIN_CACHE_TOKENS", 5)
+    cache = make_cache()
+    cache.get_model("short", "коротко", "kb1")
+    cache.get_model("long", "досить довгі статичні інструкції для кешування", "kb1")
+    assert cache.info()["short"]["mode"] == "system_instruction"
+    assert cache.info()["long"]["mode"] == "context_cache"
+
+    usage = cache.get_model("short", "коротко", "kb1").generate_content("питання").usage_metadata
+    assert usage.cached_content_token_count == 0
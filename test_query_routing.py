@@ -0,0 +1,54 @@
+from core_api.query_routing import analyze_query, classify_catalog, count_routed_hits
+
+# Проверка таблиц ключевых слов: правки в них легко ломают маршрутизацию молча.
+#   python -m pytest test_query_routing.py
+
+def categories(question: str, **kwargs) -> set:
+    where = analyze_query(question, **kwargs)
+    return set(where["category"]["$in"]) if where and "category" in where else set()
+
+def test_catalog_partitions():
+    assert classify_catalog("ChocoCraft.pdf") == {"brand": "Optima", "category": "chocolate"}
+    assert classify_catalog("Каталог суміші.pdf") == {"brand": "Optima", "category": "mixes"}
+    assert classify_catalog("Наповнювачі_макові.pdf") == {"brand": "Golden Mile", "category": "poppy"}
+    assert classify_catalog("Макова начинка_листовка2_web 1.pdf")["category"] == "poppy"
+    assert classify_catalog("Наповнювачі_молочні.pdf")["category"] == "dairy"
+    assert classify_catalog("Наповнювачі_сироп.pdf")["category"] == "syrup"
+    assert classify_catalog("Наповнювачі_фруктові.pdf")["category"] == "fruit"
+    assert classify_catalog("Наповнювачі_кондитерські.pdf")["category"] == "confectionery"
+    assert classify_catalog("Мед штучний.pdf")["category"] == "honey"
+    assert classify_catalog("Наповнювачі.pdf") == {"brand": "Golden Mile", "category": "general"}
+    assert classify_catalog("Наповнювачі_гетерогенні.pdf") == {"brand": "Golden Mile", "category": "general"}
+    assert classify_catalog("Наповнювачі_гомогенні.pdf") == {"brand": "Golden Mile", "category": "general"}
+    assert classify_catalog("balex_knowledge.txt") == {"brand": "all", "category": "general"}
+
+def test_single_category():
+    assert categories("Яка макова начинка термостабільна?") == {"poppy", "general"}
+    assert categories("мед штучний") == {"honey", "general"}
+    assert categories("Який сироп для бісквіта?") == {"syrup", "general"}
+
+def test_no_false_positives():
+    assert analyze_query("Максимальна термостабільність") is None
+    assert analyze_query("медичний сертифікат") is None
+
+def test_brand_only():
+    assert analyze_query("Що є у Optima?") == {"brand": {"$in": ["Optima", "all"]}}
+
+def test_mix_and_filling():
+    assert categories("вишнева начинка і суміш Optima") == {"fruit", "mixes", "general"}
+
+def test_dosage_question_keeps_mixes():
+    assert categories("Карамельна начинка для еклерів — яке дозування?") == {"dairy", "mixes", "general"}
+    assert categories("Вишнева начинка, об’єм 500 шт/день") == {"fruit", "mixes", "general"}
+    assert categories("Вишнева начинка, обʼєм 500 шт/день") == {"fruit", "mixes", "general"}
+
+def test_recipe_calculator_keeps_mixes():
+    assert categories("булочки з маком", include_mixes=True) == {"poppy", "mixes", "general"}
+    assert categories("круасани з вишнею", include_mixes=True) == {"fruit", "mixes", "general"}
+    assert analyze_query("еклери", include_mixes=True) is None
+
+def test_routed_hits_ignore_general_chunks():
+    where = analyze_query("Яка макова начинка?")
+    results = {"metadatas": [[{"category": "general"}, {"category": "poppy"}, {"category": "general"}]]}
+    assert count_routed_hits(results, where) == 1
+    assert count_routed_hits({"metadatas": [[]]}, where) == 0